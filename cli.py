@@ -5,14 +5,30 @@ GitAgent CLI Entry Point
 
 import os
 import sys
+import stat
 import argparse
-from typing import Optional
-from setup_user import load_user_config
-from services.mongodb_service import MongoDBService
+from typing import List, Optional
+
+class _VersionAction(argparse.Action):
+    """Print the installed package version; looked up only when --version is given"""
+    
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0, help=help)
+    
+    def __call__(self, parser, namespace, values, option_string=None):
+        # pyproject.toml is the single source of the version number
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            package_version = version("gitagent-ai")
+        except PackageNotFoundError:
+            package_version = "unknown (not installed)"
+        parser.exit(message=f"gitagent {package_version}\n")
 
 
 def check_user_setup() -> Optional[str]:
     """Check if user is properly set up"""
+    from setup_user import load_user_config
+    
     email = load_user_config()
     if not email:
         print("❌ GitAgent is not set up yet.")
@@ -22,33 +38,114 @@ def check_user_setup() -> Optional[str]:
     return email
 
 
-def check_api_key(email: str) -> bool:
-    """Check if user has a valid API key"""
-    mongo_service = MongoDBService()
+def check_api_key(email: str, refresh: bool = False, offline: bool = False) -> bool:
+    """Check if user has a valid API key
+    
+    With offline=True only a recent, locally cached successful validation
+    counts; the server is never contacted.
+    """
+    from setup_user import is_api_key_cached, cache_api_key_validation
+    
+    # Skip the MongoDB round-trip if the key was validated recently
+    if not refresh and is_api_key_cached(email):
+        return True
     
-    if not mongo_service.connect():
+    if offline:
+        print("❌ No recent API key validation is cached for offline use.")
+        print("Run GitAgent once without --no-key-check while online to validate your key.")
+        return False
+    
+    from services.mongodb_service import cached_has_valid_api_key
+    
+    if refresh:
+        cached_has_valid_api_key.cache_clear()
+    
+    try:
+        has_key = cached_has_valid_api_key(email)
+    except ConnectionError:
         print("⚠️  Cannot verify API key status (connection issue)")
         print("This may be a temporary network issue.")
         print("Please try again later or contact support if the problem persists.")
         return False  # Changed: Don't proceed if we can't verify
     
-    try:
-        has_key = mongo_service.has_valid_api_key(email)
-        if not has_key:
-            print("❌ Your API key is not configured.")
-            print("Please contact support to get your API key activated.")
-            print("GitAgent cannot function without a valid API key.")
-        return has_key
-    finally:
-        mongo_service.disconnect()
-
-
-def check_git_repository():
-    """Check if we're in a git repository"""
-    if not os.path.exists(".git"):
+    if not has_key:
+        print("❌ Your API key is not configured.")
+        print("Please contact support to get your API key activated.")
+        print("GitAgent cannot function without a valid API key.")
+    else:
+        cache_api_key_validation(email)
+    return has_key
+
+
+_repo_root: Optional[str] = None
+
+
+def find_git_root(start: Optional[str] = None) -> Optional[str]:
+    """Walk upward from start (default: cwd) to find the directory containing .git
+    
+    Only a .git directory counts. Worktrees and submodules have a .git gitlink
+    file instead, and the agent keeps its sessions and cache keys under .git/,
+    so the walk stops there and reports no repository rather than crossing
+    into an enclosing one.
+    """
+    global _repo_root
+    if start is None and _repo_root is not None:
+        return _repo_root
+    
+    path = os.path.abspath(start or os.getcwd())
+    while True:
+        try:
+            git_stat = os.stat(os.path.join(path, ".git"))
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+            continue
+        
+        if not stat.S_ISDIR(git_stat.st_mode):
+            return None
+        if start is None:
+            _repo_root = path
+        return path
+
+
+def check_git_repository() -> str:
+    """Check if we're in a git repository and return its root"""
+    repo_root = find_git_root()
+    if repo_root is None:
         print("❌ Not in a Git repository.")
-        print("Please run this command from a Git repository root.")
+        print("Please run this command from inside a Git repository.")
+        print("(Worktrees and submodules with a .git file are not supported.)")
         sys.exit(1)
+    return repo_root
+
+
+def print_agent_response(response: str, executed_commands: List[str]):
+    """Print the agent's final response and the commands it executed"""
+    print("\n" + "="*60)
+    print("🎯 GitAgent Response:")
+    print("="*60)
+    print(response)
+    
+    if executed_commands:
+        print(f"\n📋 Commands executed in this session: {len(executed_commands)}")
+        for i, cmd in enumerate(executed_commands, 1):
+            print(f"  {i}. git {cmd}")
+
+
+def prewarm_agent_import():
+    """Import the agent module in the background so it overlaps with network I/O"""
+    import threading
+    
+    def _import():
+        try:
+            import git_agent_langgraph  # noqa: F401
+        except Exception:
+            # Any real import error is reported when the agent is imported for use
+            pass
+    
+    threading.Thread(target=_import, daemon=True).start()
 
 
 def main():
@@ -56,7 +153,11 @@ def main():
     parser = argparse.ArgumentParser(
         description="GitAgent - AI-powered Git assistant with persistent context"
     )
-    parser.add_argument("query", nargs="*", help="Your query for the Git agent")
+    parser.add_argument(
+        "query",
+        nargs="*",
+        help="Your query for the Git agent (quote it to keep shell characters intact)"
+    )
     parser.add_argument(
         "--auto-approve", "-y", 
         action="store_true", 
@@ -67,7 +168,34 @@ def main():
         action="store_true", 
         help="Run user setup"
     )
+    parser.add_argument(
+        "--strict-llm",
+        action="store_true",
+        help="Always ask the AI to plan each step, even for simple requests"
+    )
+    parser.add_argument(
+        "--no-key-check",
+        action="store_true",
+        help="Don't contact the server for API key validation; requires a recent cached validation (offline mode)"
+    )
+    parser.add_argument(
+        "--refresh-key",
+        action="store_true",
+        help="Ignore cached API key validation and recheck with the server"
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep a warm agent running for this repository to speed up -y queries"
+    )
+    parser.add_argument(
+        "--version", "-V",
+        action=_VersionAction,
+        help="Show the installed GitAgent version and exit"
+    )
     
+    # Heavy modules (pymongo, langgraph) are imported lazily below, so
+    # --help and argument errors exit here without paying for them
     args = parser.parse_args()
     
     # Handle setup command
@@ -77,7 +205,7 @@ def main():
         return
     
     # Check if we're in a git repository
-    check_git_repository()
+    repo_root = check_git_repository()
     
     # Check user setup
     email = check_user_setup()
@@ -85,7 +213,7 @@ def main():
         sys.exit(1)
     
     # Check API key status - MUST have valid key to proceed
-    if not check_api_key(email):
+    if not check_api_key(email, refresh=args.refresh_key and not args.no_key_check, offline=args.no_key_check):
         print("\n" + "="*60)
         print("🔒 ACCESS DENIED")
         print("="*60)
@@ -97,33 +225,49 @@ def main():
         print(f"\nYour registered email: {email}")
         sys.exit(1)
     
+    # Handle daemon command
+    if args.daemon:
+        from gitagent_daemon import run_daemon
+        run_daemon(repo_root, strict_llm=args.strict_llm)
+        return
+    
     # Get query
-    if args.query:
+    if len(args.query) == 1:
+        query = args.query[0]
+    elif args.query:
         query = " ".join(args.query)
     else:
+        # The key is good and only -y queries can be answered by a daemon, so an
+        # interactive run will need the agent; import it while the user types
+        if not args.auto_approve:
+            prewarm_agent_import()
         query = input("What would you like to do with your Git repository? ")
     
     if not query:
         print("❌ No query provided.")
         sys.exit(1)
     
+    # Auto-approved queries can be served by a warm daemon without any prompts
+    if args.auto_approve:
+        from gitagent_daemon import send_query
+        
+        reply = send_query(repo_root, query, strict_llm=args.strict_llm)
+        if reply is not None:
+            if "error" in reply:
+                print(f"❌ Error running GitAgent: {reply['error']}")
+                sys.exit(1)
+            print(reply["output"], end='')
+            print_agent_response(reply["response"], reply["executed_commands"])
+            return
+    
     # Import and run the existing GitAgent
     try:
         from git_agent_langgraph import UnifiedGitAgent
         
         print("✅ API key verified. Initializing GitAgent...")
-        agent = UnifiedGitAgent(auto_approve=args.auto_approve)
+        agent = UnifiedGitAgent(auto_approve=args.auto_approve, repo_root=repo_root, strict_llm=args.strict_llm)
         response, executed_commands = agent.process_query(query)
-        
-        print("\n" + "="*60)
-        print("🎯 GitAgent Response:")
-        print("="*60)
-        print(response)
-        
-        if executed_commands:
-            print(f"\n📋 Commands executed in this session: {len(executed_commands)}")
-            for i, cmd in enumerate(executed_commands, 1):
-                print(f"  {i}. git {cmd}")
+        print_agent_response(response, executed_commands)
                 
     except Exception as e:
         print(f"❌ Error running GitAgent: {e}")
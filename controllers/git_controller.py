@@ -9,8 +9,7 @@ class GitController:
         response, executed_commands = self.git_service.process_query(query)
         
         if executed_commands:
-            print("\n📋 Summary of Actions Taken:")
-            for i, cmd in enumerate(executed_commands, 1):
-                print(f"{i}. {cmd}")
+            print("\n📋 Summary of Actions Taken:\n" +
+                  "\n".join(f"{i}. {cmd}" for i, cmd in enumerate(executed_commands, 1)))
         
         return response 
\ No newline at end of file
@@ -9,25 +9,33 @@ including persistent context management, session handling, and command verificat
 
 import os
 import time
+import itertools
 import subprocess
 import sys
 
+SEPARATOR = "=" * 60
+
 def clear_screen():
     """Clear the terminal screen."""
     os.system('cls' if os.name == 'nt' else 'clear')
 
 def print_section(title):
     """Print a section title."""
-    print("\n" + "=" * 60)
-    print(f"  {title}")
-    print("=" * 60 + "\n")
+    print(f"\n{SEPARATOR}\n  {title}\n{SEPARATOR}\n")
 
 def print_slowly(text, delay=0.03):
-    """Print text with a typewriter effect."""
+    """Print text with a typewriter effect (instantly when output is not a terminal)."""
+    if not delay or not sys.stdout.isatty():
+        print(text)
+        return
+    # Write straight to the terminal fd to skip the text-stream layer per character
+    sys.stdout.flush()
+    fd = sys.stdout.fileno()
     for char in text:
-        print(char, end='', flush=True)
-        time.sleep(delay)
-    print()
+        os.write(fd, char.encode())
+        if not char.isspace():
+            time.sleep(delay)
+    os.write(fd, b"\n")
 
 def wait_for_key():
     """Wait for the user to press a key."""
@@ -42,9 +50,22 @@ def run_demo_command(command, description, show_output=True):
     
     if show_output:
         # Actually execute the command
-        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-        for line in process.stdout:
-            print(line, end='')
+        if os.name == 'nt':
+            process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            for line in process.stdout:
+                print(line, end='')
+        else:
+            # Copy raw chunks straight to stdout to skip per-line decoding and buffering
+            process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0)
+            fd = process.stdout.fileno()
+            sys.stdout.flush()
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                sys.stdout.buffer.write(chunk)
+                sys.stdout.buffer.flush()
+            process.stdout.close()
         process.wait()
     else:
         # Just show what would be executed
@@ -103,10 +124,12 @@ def main():
     # Show session files if they exist
     session_dir = ".git/gitagent_sessions"
     if os.path.exists(session_dir):
-        session_files = os.listdir(session_dir)
+        # Only the first 3 names are shown, so stop scanning once we have them
+        with os.scandir(session_dir) as entries:
+            session_files = list(itertools.islice((entry.name for entry in entries), 3))
         if session_files:
-            print_slowly(f"\nCurrent session files: {len(session_files)}")
-            for session_file in session_files[:3]:  # Show first 3
+            print_slowly(f"\nCurrent session files (first {len(session_files)}):")
+            for session_file in session_files:
                 print_slowly(f"  • {session_file}")
     
     wait_for_key()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+GitAgent background daemon
+
+Keeps one warm UnifiedGitAgent per repository behind a Unix domain socket so
+repeated auto-approved CLI calls skip interpreter startup and langgraph imports.
+Interactive queries still run in-process, since confirmations need the terminal.
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import hashlib
+import tempfile
+import contextlib
+import socketserver
+from typing import Optional, Dict, Any
+
+
+def is_supported() -> bool:
+    """Unix domain sockets and Unix file ownership are required for daemon mode"""
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+
+def get_socket_dir() -> str:
+    """Get the directory holding this user's daemon sockets"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        # Already private to the user (mode 0700, owned by them)
+        return runtime_dir
+    # The shared temp dir is world-writable, so use a private per-user directory in it
+    return os.path.join(tempfile.gettempdir(), f"gitagent-{os.getuid()}")
+
+
+def get_socket_path(repo_root: str) -> str:
+    """Get the per-repository socket path"""
+    repo_hash = hashlib.sha1(os.path.realpath(repo_root).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(get_socket_dir(), f"gitagent-{repo_hash}.sock")
+
+
+def _owned_by_current_user(path: str) -> bool:
+    """Check that path exists and belongs to the current user (symlinks are not followed)"""
+    try:
+        return os.lstat(path).st_uid == os.getuid()
+    except OSError:
+        return False
+
+
+def send_query(repo_root: str, query: str, strict_llm: bool = False) -> Optional[Dict[str, Any]]:
+    """Send a query to a running daemon; return None if no daemon is listening"""
+    if not is_supported():
+        return None
+
+    socket_path = get_socket_path(repo_root)
+    # Anyone else's socket at this path could feed us arbitrary output; ignore it
+    if not _owned_by_current_user(socket_path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            # Commands run where the client was started, just like in-process runs
+            request = {"query": query, "strict_llm": strict_llm, "cwd": os.getcwd()}
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with client.makefile("rb") as reader:
+                line = reader.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    """Run one JSON-line query against the warm agent and reply with one JSON line"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            repo_root = self.server.repo_root
+            cwd = os.path.realpath(request.get("cwd") or repo_root)
+            if os.path.commonpath([cwd, repo_root]) != repo_root:
+                raise ValueError(f"{cwd} is not inside {repo_root}")
+            
+            # Queries are served one at a time, so the flag and working directory
+            # can be set per query
+            agent = self.server.agent
+            agent.strict_llm = self.server.strict_llm or request.get("strict_llm", False)
+            output = io.StringIO()
+            os.chdir(cwd)
+            try:
+                with contextlib.redirect_stdout(output):
+                    response, executed_commands = agent.process_query(request["query"])
+            finally:
+                os.chdir(repo_root)
+            reply = {
+                "output": output.getvalue(),
+                "response": response,
+                "executed_commands": executed_commands
+            }
+        except SystemExit as e:
+            # A stray sys.exit() in the agent must not take the whole daemon down
+            reply = {"error": f"Agent exited with status {e.code}"}
+        except Exception as e:
+            reply = {"error": str(e)}
+
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+def run_daemon(repo_root: str, strict_llm: bool = False):
+    """Serve auto-approved queries for repo_root until interrupted"""
+    if not is_supported():
+        print("❌ Daemon mode requires Unix domain socket support.")
+        sys.exit(1)
+
+    from git_agent_langgraph import UnifiedGitAgent
+
+    repo_root = os.path.realpath(repo_root)
+    os.chdir(repo_root)
+    socket_dir = get_socket_dir()
+    os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    dir_stat = os.lstat(socket_dir)
+    if dir_stat.st_uid != os.getuid() or dir_stat.st_mode & 0o077:
+        print(f"❌ Refusing to use {socket_dir}: it must be a directory owned by you with mode 0700")
+        sys.exit(1)
+
+    socket_path = get_socket_path(repo_root)
+    if os.path.exists(socket_path):
+        if _is_listening(socket_path):
+            print(f"❌ A GitAgent daemon is already running for {repo_root}")
+            sys.exit(1)
+        os.unlink(socket_path)
+
+    # Create the socket without group/other access, rather than chmod-ing it after bind
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, _QueryHandler)
+    finally:
+        os.umask(old_umask)
+    server.strict_llm = strict_llm
+    server.repo_root = repo_root
+    server.agent = UnifiedGitAgent(auto_approve=True, repo_root=repo_root, strict_llm=strict_llm)
+
+    print(f"🟢 GitAgent daemon listening on {socket_path}")
+    print("Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 GitAgent daemon stopped.")
+    finally:
+        server.server_close()
+        with contextlib.suppress(OSError):
+            os.unlink(socket_path)
+
+
+def _is_listening(socket_path: str) -> bool:
+    """Check whether something accepts connections on socket_path"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
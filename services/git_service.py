@@ -1,16 +1,187 @@
 import json
-from typing import Dict, List, Tuple, Any, Literal, TypedDict
-from services.groq_api_service import GroqAPIService
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple, Any, Literal, TypedDict
+from services.groq_api_service import GroqAPIService, StreamInterruptedError
 from utils.input_handler import get_confirmation
 from utils.streaming import stream_text, stream_formatted_text
 from langgraph.graph import StateGraph, END
 
 from utils.git_commands import (
-    get_git_status, get_git_branch, get_git_remote_branches,
-    get_git_log, get_git_diff, get_git_unpushed_commits,
-    get_remotes, execute_git_command
+    get_git_status, get_git_refs, get_git_log, get_git_diff,
+    execute_git_command, git_path_mtimes, READ_ONLY_GIT_COMMANDS,
+    WORKTREE_ONLY_GIT_COMMANDS, REF_DEPS, REMOTE_REF_DEPS
 )
 
+# Patterns used by the analyzer, compiled once
+BRANCH_NAME_RE = re.compile(r'branch\s+(?:named\s+)?([^\s]+)')
+ACTION_JSON_RE = re.compile(r'\{[^{}]*"action_type"[^{}]*\}', re.DOTALL)
+# The current branch line of a `git branch` style listing
+CURRENT_BRANCH_RE = re.compile(r'^\*[ \t]*(.*?)[ \t]*$', re.MULTILINE)
+# Characters of a command's output kept in the history for the responder prompt
+HISTORY_RESULT_LIMIT = 500
+
+# Words in a command's output that mean it may not have gone through. Only the
+# start is anchored, so "conflicts", "errors" and "CONFLICT (content)" all count
+COMMAND_ISSUE_RE = re.compile(r'\b(?:error|conflict|fatal|rejected|refusing)', re.I)
+
+# Workflow context flags set by an executed command. Option forms are checked
+# first, since their verb alone ("branch", "checkout") means something else
+OPTION_CONTEXT_FLAGS = (
+    ("branch -d", "branch_deleted"),
+    ("branch -D", "branch_deleted"),
+    ("checkout -b", "new_branch_created"),
+    ("switch -c", "new_branch_created"),
+)
+VERB_CONTEXT_FLAGS = {"add": "changes_staged", "commit": "changes_committed", "push": "changes_pushed"}
+
+# Phrases in the analyzer's reasoning that announce more steps (matched anywhere)
+CONTINUATION_RE = re.compile(
+    r'next step|additional step|subsequent step|then|after this|following|next|continue|more steps|still need|will be to',
+    re.I
+)
+# Operations a query can ask for; each distinct one found counts as a step
+OPERATION_RE = re.compile(r'delete|create|add|stage|commit|push|merge|checkout|switch')
+
+# Static part of the analyzer prompt. It comes first and never changes, so the
+# API can reuse its prefix across calls; only the tail built per step differs
+ANALYZER_PREAMBLE = """
+        You are GitAgent, an AI assistant specialized in Git operations with deep knowledge of Git constraints and best practices.
+        
+        IMPORTANT Git Workflow Rules - You MUST follow these:
+        1. **Cannot delete current branch**: To delete the branch you are on, first checkout a different branch (usually 'main' or 'master'); once switched away, delete it
+        2. **Branch deletion context**: "delete current branch" means the original branch given below, NOT the branch you're on after switching
+        3. **Branch creation flow**: When creating branches, ensure you're on the right base branch first
+        4. **Staging before commit**: If files aren't staged, stage them before committing
+        5. **Push new branches**: Use -u origin when pushing a new branch for the first time
+        
+        Multi-step workflow handling:
+        1. Execute ONE command at a time; the user confirms each step
+        2. Pick the NEXT command from the original request (interpreted once at the start), the commands already executed, and what still needs to be done
+        3. Continue until the entire user request is fulfilled
+        
+        Choose "execute_command" for Git operations: add, commit, push, pull, branch/checkout/switch, merge, branch -d/-D, stash, reset.
+        Choose "provide_info" ONLY for information requests, Git concept questions and status explanations.
+        
+        CRITICAL: Return ONLY a valid JSON object, nothing else.
+        
+        JSON structure:
+        {
+            "action_type": "execute_command" | "provide_info" | "end",
+            "command": "the git command to execute (if applicable)",
+            "reasoning": "your reasoning for this action, including any additional steps that will be needed"
+        }
+        """
+
+# Per-step prompt sections, parsed once; only the state values are substituted
+ANALYZER_STATE_PROMPT = string.Template("""
+        Git repository information:
+        - Status: $status
+        - Current branches: $branches
+        - Current branch: $current_branch
+        - Original branch (when workflow started): $original_branch
+        - Recent commits: $recent_commits
+        - Current changes: $diff_stat
+        
+        User query: $query$context_info
+        
+        Target branch if deleting the "current" branch: $branch_to_delete
+        Workflow step: $workflow_step
+        
+        RESPOND WITH ONLY THE JSON OBJECT, NO OTHER TEXT.
+        """)
+
+INFO_PROMPT = string.Template("""
+        You are GitAgent, an AI assistant specialized in Git operations.
+        Based on the Git repository information, provide a helpful response to the user's query.
+        
+        Git repository information:
+        - Status: $status
+        - Current branches: $branches
+        - Recent commits: $recent_commits
+        - Current changes: $diff_stat
+        
+        User query: $query
+        
+        Your reasoning: $reasoning
+        
+        Provide a clear and concise answer to the user's question. Include specific details from 
+        the repository information provided above. If relevant, suggest Git commands that 
+        the user could run, but format them clearly as suggestions, not as commands to be executed.
+        """)
+
+RESPONDER_PROMPT = string.Template("""
+        You are GitAgent, an AI assistant specialized in Git operations.
+        Based on all information gathered and actions taken, provide a final response to the user's query.
+        
+        Current Git repository information:
+        - Status: $status
+        - Current branches: $branches
+        - Recent commits: $recent_commits
+        - Current changes: $diff_stat
+        
+        User query: $query
+        
+        Actions taken:
+        $history_text
+        
+        Provide a clear, helpful, and comprehensive final response to the user's query.
+        Include explanations of what was done, what was found, and any additional recommendations.
+        
+        If the workflow was completed successfully, summarize the changes made.
+        If there were any issues, explain what might have gone wrong and suggest solutions.
+        If additional steps are needed to complete the user's original request, clearly outline them.
+        """)
+
+# Queries that are literally a git command; the analyzer answers them without the AI.
+# "{0}" in a command is filled from the pattern's first group
+FAST_PATH_ACTIONS = (
+    (re.compile(r'^\s*(?:git\s+)?(?:add|stage)\s+(?:all|everything|\.)\s*$', re.I),
+     {"action_type": "execute_command", "command": "add .", "reasoning": "Staging all changes as requested"}),
+    (re.compile(r'^\s*(?:git\s+)?(?:status|st)\s*$', re.I),
+     {"action_type": "execute_command", "command": "status", "reasoning": "Showing the repository status as requested"}),
+    (re.compile(r'^\s*(?:git\s+)?push\s*$', re.I),
+     {"action_type": "execute_command", "command": "push", "reasoning": "Pushing the current branch as requested"}),
+    (re.compile(r'^\s*(?:git\s+)?pull\s*$', re.I),
+     {"action_type": "execute_command", "command": "pull", "reasoning": "Pulling the latest changes as requested"}),
+    # Only path-like arguments (with a ".", "/" or "*"), so "add a login page" still goes to the AI
+    (re.compile(r'^\s*(?:git\s+)?(?:add|stage)\s+(\S*[./*]\S*(?:\s+\S*[./*]\S*)*)\s*$', re.I),
+     {"action_type": "execute_command", "command": "add {0}", "reasoning": "Staging the requested paths"}),
+    (re.compile(r'^\s*(?:git\s+)?commit\s+-m\s+("[^"]+"|\'[^\']+\')\s*$', re.I),
+     {"action_type": "execute_command", "command": "commit -m {0}", "reasoning": "Committing with the given message"}),
+    (re.compile(r'^\s*(?:git\s+)?(?:checkout|switch)\s+(?:to\s+)?(?:(?:the\s+)?branch\s+)?([\w.][\w./-]*)\s*$', re.I),
+     {"action_type": "execute_command", "command": "checkout {0}", "reasoning": "Switching branches as requested"}),
+    (re.compile(r'^\s*(?:git\s+)?(?:branch|branches|(?:list|show)\s+(?:all\s+)?(?:the\s+)?branches)\s*$', re.I),
+     {"action_type": "execute_command", "command": "branch", "reasoning": "Listing branches as requested"}),
+)
+
+_json_decoder = json.JSONDecoder()
+
+def parse_action_json(text: str) -> Optional[Dict[str, Any]]:
+    """Return the action object in an analyzer reply, or None if there is none.
+    
+    A well-formed reply is decoded straight from its first "{"; replies with
+    prose around or inside the object fall back to ACTION_JSON_RE.
+    """
+    start = text.find('{')
+    if start == -1:
+        return None
+    try:
+        action, _ = _json_decoder.raw_decode(text, start)
+        if isinstance(action, dict):
+            return action
+    except json.JSONDecodeError:
+        pass
+    
+    match = ACTION_JSON_RE.search(text, start)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+    return None
+
 # Define agent state and action models
 class GitAction(TypedDict):
     action_type: Literal["execute_command", "provide_info", "end"]
@@ -19,13 +190,13 @@ class GitAction(TypedDict):
 
 class GitAgentState(TypedDict):
     query: str
+    query_lower: str  # query.lower(), computed once per query
     status: str
     branches: str
+    current_branch: str  # Parsed from branches; kept in step with it
     recent_commits: str
     diff_stat: str
     remote_branches: str
-    unpushed_commits: str
-    remotes: str
     history: List[Dict[str, Any]]
     action: GitAction
     response: str
@@ -33,54 +204,126 @@ class GitAgentState(TypedDict):
     workflow_step: int  # Track which step we're on in multi-step workflows
     original_branch: str  # Remember the original branch when workflow started
     workflow_context: Dict[str, Any]  # Track workflow-specific context
+    executed_commands: List[str]  # Commands run so far, in order
+    executed_verbs: Set[str]  # First word of each executed command
+    last_result: str  # Full output of the latest command; history keeps a clipped copy
+    service: Any  # The GitService running this query; the shared graph's nodes call into it
+
+def _service_call(method_name: str):
+    """Graph node/router that forwards to the named method of the state's GitService."""
+    def call(state: GitAgentState):
+        return getattr(state["service"], method_name)(state)
+    return call
 
 class GitService:
+    # The graph topology is the same for every instance, so it is compiled once
+    _compiled_agent = None
+    
     def __init__(self):
         self.groq_service = GroqAPIService()
-        self.agent = self._build_agent()
+        if GitService._compiled_agent is None:
+            GitService._compiled_agent = self._build_agent()
+        self.agent = GitService._compiled_agent
+        self._repo_cache: Dict[str, Tuple[Tuple, str]] = {}
+    
+    def _cached(self, name: str, fn, deps: Tuple[str, ...]) -> str:
+        """Return fn()'s cached output while the mtimes of the given .git paths are unchanged."""
+        key = git_path_mtimes(".git", deps)
+        cached = self._repo_cache.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        output = fn()
+        self._repo_cache[name] = (key, output)
+        return output
+    
+    def _head_detached(self) -> bool:
+        """Check .git/HEAD directly; an attached HEAD is a symbolic "ref: ..." line."""
+        try:
+            with open(".git/HEAD") as f:
+                return not f.read().startswith("ref:")
+        except OSError:
+            return False
     
     def get_repo_info(self) -> Dict[str, str]:
-        return {
-            "status": get_git_status(),
-            "branches": get_git_branch(),
-            "remote_branches": get_git_remote_branches(),
-            "recent_commits": get_git_log(),
-            "diff_stat": get_git_diff(),
-            "unpushed_commits": get_git_unpushed_commits(),
-            "remotes": get_remotes()
+        # Only what the prompts read is collected.
+        # status and diff depend on the working tree, so they are never cached
+        tasks = {
+            "status": get_git_status,
+            "refs": lambda: self._cached("refs", lambda: get_git_refs(self._head_detached()), REF_DEPS + REMOTE_REF_DEPS),
+            "recent_commits": lambda: self._cached("recent_commits", get_git_log, REF_DEPS),
+            "diff_stat": get_git_diff
         }
+        
+        # The git calls are independent subprocesses, so run them side by side
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {name: executor.submit(fn) for name, fn in tasks.items()}
+            repo_info = {name: future.result() for name, future in futures.items()}
+        
+        # Local and remote branch listings both come from one for-each-ref call
+        repo_info["branches"], repo_info["remote_branches"] = repo_info.pop("refs")
+        return repo_info
     
     def _extract_current_branch(self, branches_output: str) -> str:
         """Extract the current branch name from git branch output."""
-        lines = branches_output.split('\n')
-        for line in lines:
-            if line.strip().startswith('*'):
-                # Remove the * and any extra whitespace
-                current_branch = line.strip()[1:].strip()
-                # Handle detached HEAD state
-                if current_branch.startswith('('):
-                    return "HEAD (detached)"
-                return current_branch
-        return "unknown"
+        match = CURRENT_BRANCH_RE.search(branches_output)
+        if not match:
+            return "unknown"
+        # Handle detached HEAD state
+        if match.group(1).startswith('('):
+            return "HEAD (detached)"
+        return match.group(1)
+    
+    def _stream_answer(self, prompt: str) -> Optional[str]:
+        """Print the AI's answer as it is generated and return the full text, or None if nothing arrived."""
+        chunks = []
+        try:
+            for chunk in self.groq_service.stream_response(prompt):
+                if not chunks:
+                    print("\n", end='')
+                print(chunk, end='', flush=True)
+                chunks.append(chunk)
+        except StreamInterruptedError:
+            # Don't pass the partial text off as the answer; ask again without streaming
+            print("\n⚠️ The answer was cut off, fetching it again...")
+            response = self.groq_service.generate_response(prompt)
+            if response is not None:
+                print(response)
+            return response
+        
+        if not chunks:
+            return None
+        print()
+        return "".join(chunks)
     
     # Agent workflow nodes
     def _analyzer(self, state: GitAgentState) -> GitAgentState:
         """Analyze the repository and decide what action to take."""
         
+        # A query that is just a git command needs no planning
+        if state["workflow_step"] == 0:
+            for pattern, fast_action in FAST_PATH_ACTIONS:
+                match = pattern.match(state["query"])
+                if match:
+                    action = dict(fast_action)
+                    action["command"] = action["command"].format(*match.groups())
+                    state["action"] = action
+                    state["history"].append({"action": action, "state": "analyzer"})
+                    return state
+        
         # Check if this is a continuation of a multi-step workflow
-        executed_commands = [entry["action"]["command"] for entry in state["history"] 
-                           if "state" in entry and entry["state"] == "command_executor" and "action" in entry]
+        executed_commands = state["executed_commands"]
         
         context_info = ""
         if executed_commands:
             context_info = f"\nCommands already executed in this workflow: {', '.join([f'git {cmd}' for cmd in executed_commands])}"
         
         # Extract current branch from git status/branch info
-        current_branch = self._extract_current_branch(state["branches"])
+        current_branch = state["current_branch"]
         
         # On first analysis, set up workflow context for branch operations
         if state["workflow_step"] == 0 and not state["workflow_context"]:
-            original_query = state["query"].lower()
+            original_query = state["query_lower"]
             
             # Parse the original intent and remember key context
             if "delete" in original_query and ("current branch" in original_query or "this branch" in original_query):
@@ -90,90 +333,27 @@ class GitService:
             
             if "create" in original_query and "branch" in original_query:
                 # Extract new branch name if possible
-                import re
-                branch_match = re.search(r'branch\s+(?:named\s+)?([^\s]+)', original_query)
+                branch_match = BRANCH_NAME_RE.search(original_query)
                 if branch_match:
                     state["workflow_context"]["new_branch_name"] = branch_match.group(1)
         
         # Use workflow context to avoid re-interpreting intent
         branch_to_delete = state["workflow_context"].get("target_branch_to_delete", current_branch)
         
-        prompt = f"""
-        You are GitAgent, an AI assistant specialized in Git operations with deep knowledge of Git constraints and best practices.
-        
-        Git repository information:
-        - Status: {state["status"]}
-        - Current branches: {state["branches"]}
-        - Current branch: {current_branch}
-        - Original branch (when workflow started): {state["original_branch"]}
-        - Recent commits: {state["recent_commits"]}
-        - Current changes: {state["diff_stat"]}
-        
-        User query: {state["query"]}{context_info}
-        
-        WORKFLOW CONTEXT - IMPORTANT:
-        - If user said "delete current branch" they meant the original branch: {state["original_branch"]}
-        - Target branch to delete: {branch_to_delete}
-        - Do NOT re-interpret "current branch" after switching branches
-        - Workflow step: {state["workflow_step"]}
-        
-        IMPORTANT Git Workflow Rules - You MUST follow these:
-        1. **Cannot delete current branch**: If user wants to delete the current branch, you MUST first checkout to a different branch (usually 'main' or 'master')
-        2. **Branch deletion context**: When user says "delete current branch", they mean the branch they were on when they started ({state["original_branch"]}), NOT the branch they're on now after switching
-        3. **Branch creation flow**: When creating branches, ensure you're on the right base branch first
-        4. **Staging before commit**: Always stage changes before committing
-        5. **Push new branches**: Use -u flag when pushing new branches for the first time
-        
-        PROACTIVE ERROR PREVENTION:
-        - If user wants to delete original branch "{state["original_branch"]}" and we're still on it, first command should be switching to 'main' or 'master'
-        - Once we've switched away from "{state["original_branch"]}", we can safely delete it
-        - If user wants to commit but files aren't staged, add staging step first
-        - If user wants to push a new branch, include the -u origin flag
-        
-        Multi-step workflow handling:
-        1. Execute ONE command at a time
-        2. After each command, user will be asked for confirmation for the NEXT step
-        3. Continue until the entire user request is fulfilled
-        4. Account for Git constraints in your command sequence
-        5. Remember original context - don't re-interpret after branch switches
-        
-        Choose "execute_command" for Git operations:
-        - Add files (git add)
-        - Commit changes (git commit)
-        - Push changes (git push)
-        - Pull changes (git pull)
-        - Create or switch branches (git branch, git checkout, git switch)
-        - Merge branches (git merge) 
-        - Delete branches (git branch -d/-D) - BUT checkout first if deleting current branch
-        - Stash changes (git stash)
-        - Reset changes (git reset)
-        
-        Choose "provide_info" ONLY for:
-        - Information requests
-        - Help with Git concepts
-        - Status explanations
-        - Non-action queries
-        
-        For multi-step queries, determine the NEXT command based on:
-        1. User's original request (interpreted once at the beginning)
-        2. Commands already executed
-        3. Git workflow constraints and best practices
-        4. What still needs to be done
-        5. Workflow context (don't re-interpret original intent)
-        
-        CRITICAL: Return ONLY a valid JSON object, nothing else.
-        
-        JSON structure:
-        {{
-            "action_type": "execute_command" | "provide_info" | "end",
-            "command": "the git command to execute (if applicable)",
-            "reasoning": "your reasoning for this action, including any additional steps that will be needed"
-        }}
-        
-        RESPOND WITH ONLY THE JSON OBJECT, NO OTHER TEXT.
-        """
+        prompt = ANALYZER_PREAMBLE + ANALYZER_STATE_PROMPT.substitute(
+            status=state["status"],
+            branches=state["branches"],
+            current_branch=current_branch,
+            original_branch=state["original_branch"],
+            recent_commits=state["recent_commits"],
+            diff_stat=state["diff_stat"],
+            query=state["query"],
+            context_info=context_info,
+            branch_to_delete=branch_to_delete,
+            workflow_step=state["workflow_step"]
+        )
         
-        response = self.groq_service.generate_response(prompt)
+        response = self.groq_service.generate_response(prompt, json_mode=True)
         
         if response is None:
             # Fallback action if API fails
@@ -183,42 +363,23 @@ class GitService:
                 "reasoning": "API service unavailable. Please try again."
             }
         else:
-            try:
-                # Try to parse JSON response
-                action = json.loads(response.strip())
-            except json.JSONDecodeError as e:
-                # Try to extract JSON from the response if it's mixed content
-                try:
-                    # Look for JSON in the response
-                    import re
-                    json_match = re.search(r'\{[^{}]*"action_type"[^{}]*\}', response, re.DOTALL)
-                    if json_match:
-                        json_str = json_match.group(0)
-                        action = json.loads(json_str)
-                    else:
-                        raise ValueError("No JSON found in response")
-                except (json.JSONDecodeError, ValueError) as extract_error:
-                    # If JSON parsing fails completely, try to detect intent from text
-                    if any(keyword in response.lower() for keyword in ["add", "commit", "push", "pull", "merge", "checkout", "branch"]):
-                        # Looks like a command request, try to extract it
-                        if "add" in response.lower() and ("all" in response.lower() or "." in response):
-                            action = {
-                                "action_type": "execute_command",
-                                "command": "add .",
-                                "reasoning": "Extracted from response: stage all changes for commit"
-                            }
-                        else:
-                            action = {
-                                "action_type": "provide_info",
-                                "command": "",
-                                "reasoning": response
-                            }
-                    else:
-                        action = {
-                            "action_type": "provide_info",
-                            "command": "",
-                            "reasoning": response
-                        }
+            action = parse_action_json(response)
+            if action is None:
+                # If JSON parsing fails completely, try to detect intent from text
+                response_lower = response.lower()
+                if "add" in response_lower and ("all" in response_lower or "." in response):
+                    # Looks like a request to stage everything
+                    action = {
+                        "action_type": "execute_command",
+                        "command": "add .",
+                        "reasoning": "Extracted from response: stage all changes for commit"
+                    }
+                else:
+                    action = {
+                        "action_type": "provide_info",
+                        "command": "",
+                        "reasoning": response
+                    }
         
         state["action"] = action
         # Add to history
@@ -266,33 +427,33 @@ class GitService:
         # Update state with execution results
         state["response"] = f"✅ Command executed: git {command}\nResult:\n{result}"
         state["workflow_step"] += 1  # Increment step counter
+        verb = command.strip().partition(" ")[0]
         
         # Update workflow context to track completed operations
-        if "branch -d" in command or "branch -D" in command:
-            state["workflow_context"]["branch_deleted"] = True
-        elif "checkout -b" in command or "switch -c" in command:
-            state["workflow_context"]["new_branch_created"] = True
-        elif command.startswith("add"):
-            state["workflow_context"]["changes_staged"] = True
-        elif command.startswith("commit"):
-            state["workflow_context"]["changes_committed"] = True
-        elif command.startswith("push"):
-            state["workflow_context"]["changes_pushed"] = True
+        context_flag = next((flag for option, flag in OPTION_CONTEXT_FLAGS if option in command), None) or VERB_CONTEXT_FLAGS.get(verb)
+        if context_flag:
+            state["workflow_context"][context_flag] = True
         
         # Add to history
-        state["history"].append({"action": action, "result": result, "state": "command_executor"})
-        
-        # After executing, refresh repository info
-        state["status"] = get_git_status()
-        state["branches"] = get_git_branch()
-        state["recent_commits"] = get_git_log()
-        state["diff_stat"] = get_git_diff()
-        state["remote_branches"] = get_git_remote_branches()
-        state["unpushed_commits"] = get_git_unpushed_commits()
-        state["remotes"] = get_remotes()
+        if len(result) > HISTORY_RESULT_LIMIT:
+            history_result = result[:HISTORY_RESULT_LIMIT] + f"\n...[truncated {len(result) - HISTORY_RESULT_LIMIT} chars]"
+        else:
+            history_result = result
+        state["history"].append({"action": action, "result": history_result, "state": "command_executor"})
+        state["executed_commands"].append(command)
+        state["executed_verbs"].add(verb)
+        state["last_result"] = result
+        
+        # After executing, refresh repository info unless the command only read it
+        if verb not in READ_ONLY_GIT_COMMANDS:
+            if verb not in WORKTREE_ONLY_GIT_COMMANDS:
+                # The command may have moved a ref without touching a watched mtime
+                self._repo_cache.clear()
+            state.update(self.get_repo_info())
+            state["current_branch"] = self._extract_current_branch(state["branches"])
         
         # Check for errors or conflicts
-        if "error" in result.lower() or "conflict" in result.lower():
+        if COMMAND_ISSUE_RE.search(result):
             print("\n", end='')
             stream_text("⚠️ There might be an issue with the command execution.", delay=0.025)
             continue_execution = get_confirmation(
@@ -309,26 +470,16 @@ class GitService:
     def _info_provider(self, state: GitAgentState) -> GitAgentState:
         """Provide information without executing commands."""
         
-        prompt = f"""
-        You are GitAgent, an AI assistant specialized in Git operations.
-        Based on the Git repository information, provide a helpful response to the user's query.
-        
-        Git repository information:
-        - Status: {state["status"]}
-        - Current branches: {state["branches"]}
-        - Recent commits: {state["recent_commits"]}
-        - Current changes: {state["diff_stat"]}
-        
-        User query: {state["query"]}
-        
-        Your reasoning: {state["action"]["reasoning"]}
-        
-        Provide a clear and concise answer to the user's question. Include specific details from 
-        the repository information provided above. If relevant, suggest Git commands that 
-        the user could run, but format them clearly as suggestions, not as commands to be executed.
-        """
+        prompt = INFO_PROMPT.substitute(
+            status=state["status"],
+            branches=state["branches"],
+            recent_commits=state["recent_commits"],
+            diff_stat=state["diff_stat"],
+            query=state["query"],
+            reasoning=state["action"]["reasoning"]
+        )
         
-        response = self.groq_service.generate_response(prompt)
+        response = self._stream_answer(prompt)
         
         if response is None:
             response = "I'm sorry, I couldn't generate a response due to API issues. Please try again."
@@ -343,37 +494,36 @@ class GitService:
     def _responder(self, state: GitAgentState) -> GitAgentState:
         """Generate a final response based on the actions taken."""
         
-        # Prepare history for context
-        history_text = ""
-        for entry in state["history"]:
-            if "state" in entry:
-                if entry["state"] == "command_executor" and "result" in entry:
-                    history_text += f"Executed: git {entry['action']['command']}\nResult: {entry['result']}\n\n"
-        
-        prompt = f"""
-        You are GitAgent, an AI assistant specialized in Git operations.
-        Based on all information gathered and actions taken, provide a final response to the user's query.
-        
-        Current Git repository information:
-        - Status: {state["status"]}
-        - Current branches: {state["branches"]}
-        - Recent commits: {state["recent_commits"]}
-        - Current changes: {state["diff_stat"]}
+        executed = [entry for entry in state["history"] if entry.get("state") == "command_executor" and "result" in entry]
         
-        User query: {state["query"]}
+        # Nothing was executed, so the info provider's answer is already the final response
+        if not executed and state["action"]["action_type"] == "provide_info" and state["response"]:
+            return state
         
-        Actions taken:
-        {history_text}
+        # A single command that went through cleanly needs no AI summary
+        if (len(executed) == 1 and not state.get("execution_stopped", False)
+                and not COMMAND_ISSUE_RE.search(state["last_result"])):
+            # The history entry is clipped for prompts; show the command's full output
+            result = state["last_result"] or "(no output)"
+            state["response"] = f"✅ Executed: git {state['executed_commands'][0]}\n{result}\n\nCurrent branch: {state['current_branch']}"
+            return state
         
-        Provide a clear, helpful, and comprehensive final response to the user's query.
-        Include explanations of what was done, what was found, and any additional recommendations.
+        # Prepare history for context
+        history_text = "".join(
+            f"Executed: git {entry['action']['command']}\nResult: {entry['result']}\n\n"
+            for entry in executed
+        )
         
-        If the workflow was completed successfully, summarize the changes made.
-        If there were any issues, explain what might have gone wrong and suggest solutions.
-        If additional steps are needed to complete the user's original request, clearly outline them.
-        """
+        prompt = RESPONDER_PROMPT.substitute(
+            status=state["status"],
+            branches=state["branches"],
+            recent_commits=state["recent_commits"],
+            diff_stat=state["diff_stat"],
+            query=state["query"],
+            history_text=history_text
+        )
         
-        response = self.groq_service.generate_response(prompt)
+        response = self._stream_answer(prompt)
         
         if response is None:
             response = "Workflow completed, but I couldn't generate a final summary due to API issues."
@@ -401,18 +551,12 @@ class GitService:
         # Check if we need to re-analyze after command execution
         if state["action"]["action_type"] == "execute_command":
             reasoning = state["action"]["reasoning"]
-            original_query = state["query"].lower()
+            original_query = state["query_lower"]
             
-            executed_commands = [entry["action"]["command"] for entry in state["history"] 
-                               if "state" in entry and entry["state"] == "command_executor" and "action" in entry]
+            executed_commands = state["executed_commands"]
             
             # Check for explicit continuation indicators in reasoning
-            continuation_keywords = [
-                "next step", "additional step", "subsequent step", "then", "after this",
-                "following", "next", "continue", "more steps", "still need", "will be to"
-            ]
-            
-            has_continuation_indicator = any(keyword in reasoning.lower() for keyword in continuation_keywords)
+            has_continuation_indicator = CONTINUATION_RE.search(reasoning) is not None
             
             # Enhanced workflow pattern detection using context
             unfulfilled_operations = []
@@ -429,7 +573,7 @@ class GitService:
                     
                     if not branch_already_deleted:
                         # Check if we've switched away from the target branch first
-                        if any("checkout" in cmd or "switch" in cmd for cmd in executed_commands):
+                        if state["executed_verbs"] & {"checkout", "switch"}:
                             unfulfilled_operations.append("delete original branch")
                         else:
                             unfulfilled_operations.append("checkout to safe branch first")
@@ -459,8 +603,7 @@ class GitService:
                     unfulfilled_operations.append("push changes")
             
             # Count distinct operations mentioned vs executed
-            operation_keywords = ["delete", "create", "add", "stage", "commit", "push", "merge", "checkout", "switch"]
-            mentioned_operations = sum(1 for keyword in operation_keywords if keyword in original_query)
+            mentioned_operations = len(set(OPERATION_RE.findall(original_query)))
             
             # Continue if there are clear signs more steps are needed
             should_continue = (
@@ -474,20 +617,25 @@ class GitService:
         
         return "responder"
 
-    def _build_agent(self) -> StateGraph:
-        """Build the GitAgent workflow graph."""
+    @staticmethod
+    def _build_agent() -> StateGraph:
+        """Build the GitAgent workflow graph.
+        
+        Nodes look up the GitService in the state rather than binding one, so
+        the compiled graph can be shared by all instances.
+        """
         workflow = StateGraph(GitAgentState)
         
         # Add nodes (only the ones that modify state)
-        workflow.add_node("analyzer", self._analyzer)
-        workflow.add_node("command_executor", self._command_executor)
-        workflow.add_node("info_provider", self._info_provider)
-        workflow.add_node("responder", self._responder)
+        workflow.add_node("analyzer", _service_call("_analyzer"))
+        workflow.add_node("command_executor", _service_call("_command_executor"))
+        workflow.add_node("info_provider", _service_call("_info_provider"))
+        workflow.add_node("responder", _service_call("_responder"))
         
         # Add conditional edges (these use the routing functions)
         workflow.add_conditional_edges(
             "analyzer",
-            self._router,
+            _service_call("_router"),
             {
                 "command_executor": "command_executor",
                 "info_provider": "info_provider",
@@ -497,7 +645,7 @@ class GitService:
         
         workflow.add_conditional_edges(
             "command_executor",
-            self._should_continue,
+            _service_call("_should_continue"),
             {
                 "analyzer": "analyzer",
                 "responder": "responder"
@@ -515,23 +663,28 @@ class GitService:
     
     def process_query(self, query: str) -> Tuple[str, List[str]]:
         repo_info = self.get_repo_info()
+        current_branch = self._extract_current_branch(repo_info["branches"])
         
         initial_state = {
             "query": query,
+            "query_lower": query.lower(),
             "status": repo_info["status"],
             "branches": repo_info["branches"],
+            "current_branch": current_branch,
             "recent_commits": repo_info["recent_commits"],
             "diff_stat": repo_info["diff_stat"],
             "remote_branches": repo_info["remote_branches"],
-            "unpushed_commits": repo_info["unpushed_commits"],
-            "remotes": repo_info["remotes"],
             "history": [],
             "action": {"action_type": "", "command": "", "reasoning": ""},
             "response": "",
             "execution_stopped": False,
             "workflow_step": 0,
-            "original_branch": self._extract_current_branch(repo_info["branches"]),
-            "workflow_context": {}
+            "original_branch": current_branch,
+            "workflow_context": {},
+            "executed_commands": [],
+            "executed_verbs": set(),
+            "last_result": "",
+            "service": self
         }
         
         # Run the agentic workflow
@@ -539,11 +692,5 @@ class GitService:
         stream_text("🔍 Analyzing your Git repository...", delay=0.03)
         final_state = self.agent.invoke(initial_state)
         
-        # Extract commands from history for compatibility with controller
-        executed_commands = []
-        for entry in final_state["history"]:
-            if "state" in entry and entry["state"] == "command_executor" and "action" in entry:
-                executed_commands.append(entry["action"]["command"])
-        
         # Return response and any commands that were suggested (for controller compatibility)
-        return final_state["response"], executed_commands 
\ No newline at end of file
+        return final_state["response"], final_state["executed_commands"] 
\ No newline at end of file
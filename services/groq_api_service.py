@@ -1,9 +1,13 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
 import os
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import random
+import hashlib
+import functools
+from typing import Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 # Import configuration
@@ -12,21 +16,106 @@ from .config import GROQ_CONFIG
 # Load environment variables from .env file
 load_dotenv()
 
+# Number of distinct prompts whose responses are kept for reuse
+RESPONSE_CACHE_SIZE = 128
+
+# Retry backoff (seconds): full jitter over BACKOFF_BASE * 2**attempt, capped
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30
+
+# How long a key sits out (seconds): invalid keys for an hour, rate-limited keys
+# for the server's Retry-After, or RATE_LIMIT_COOLDOWN when it doesn't send one
+KEY_EXHAUSTED_COOLDOWN = 3600
+RATE_LIMIT_COOLDOWN = 60
+
+# After this many consecutive failed requests, calls fail fast for
+# CIRCUIT_RESET_TIME seconds before one probe request is let through
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIME = 30
+
+class StreamInterruptedError(Exception):
+    """A streamed response broke off after part of it had already been yielded."""
+
+
+def retry_delay(attempt: int, response=None) -> float:
+    """Seconds to wait before retry number attempt + 1.
+    
+    A numeric Retry-After header from the server wins; otherwise a random
+    delay up to the exponential bound, so clients that failed together don't
+    retry together.
+    """
+    if response is not None:
+        try:
+            return min(BACKOFF_CAP, float(response.headers.get("Retry-After", "")))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def rate_limit_cooldown(response) -> float:
+    """Seconds a rate-limited key should rest, from the 429's Retry-After header."""
+    try:
+        return float(response.headers.get("Retry-After", RATE_LIMIT_COOLDOWN))
+    except ValueError:
+        return RATE_LIMIT_COOLDOWN
+
+@functools.lru_cache(maxsize=1)
+def configured_api_keys() -> Tuple[str, ...]:
+    """Return the configured API keys, resolved once per process."""
+    keys = []
+    
+    # First try to load from environment variables (development)
+    key_index = 1
+    while True:
+        api_key = os.getenv(f"GROQ_API_KEY_{key_index}")
+        if not api_key:
+            break
+        keys.append(api_key)
+        key_index += 1
+    
+    # If no environment variables found, use config file (PyPI package)
+    if not keys and GROQ_CONFIG.get("api_keys"):
+        keys.extend(GROQ_CONFIG["api_keys"])
+    
+    return tuple(keys)
+
+@functools.lru_cache(maxsize=1)
+def configured_endpoint() -> Tuple[str, str]:
+    """Return (base_url, model), resolved once per process."""
+    return (
+        os.getenv("GROQ_BASE_URL") or GROQ_CONFIG.get("base_url", ""),
+        os.getenv("GROQ_MODEL") or GROQ_CONFIG.get("model", "")
+    )
+
 @dataclass
 class GroqAPIKey:
-    key: str
+    key: str = field(repr=False)
     is_exhausted: bool = False
     last_error_time: Optional[float] = None
+    cooldown_until: float = 0.0
+    # Identifies the key in logs without revealing it
+    last4: str = field(init=False)
+    
+    def __post_init__(self):
+        self.last4 = self.key[-4:]
 
 class GroqAPIService:
     def __init__(self):
         # Load API keys using config file with environment variable fallbacks
         self.api_keys = self._load_api_keys()
         self.current_key_index = 0
+        self._response_cache: Dict[Tuple[bytes, bool], str] = {}
+        self._circuit_failures = 0
+        self._circuit_opened_at: Optional[float] = None
+        
+        # One pooled session, so consecutive calls reuse the TCP/TLS connection
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers["Content-Type"] = "application/json"
         
         # Load base URL and model with environment variable fallbacks
-        self.base_url = os.getenv("GROQ_BASE_URL") or GROQ_CONFIG.get("base_url", "")
-        self.model = os.getenv("GROQ_MODEL") or GROQ_CONFIG.get("model", "")
+        self.base_url, self.model = configured_endpoint()
         
         # Validate that we have at least one API key
         if not self.api_keys:
@@ -35,27 +124,11 @@ class GroqAPIService:
             )
     
     def _load_api_keys(self) -> List[GroqAPIKey]:
-        """Load API keys from environment variables first, then config file."""
-        keys = []
+        """Load API keys from environment variables first, then config file.
         
-        # First try to load from environment variables (development)
-        key_index = 1
-        while True:
-            key_name = f"GROQ_API_KEY_{key_index}"
-            api_key = os.getenv(key_name)
-            
-            if api_key:
-                keys.append(GroqAPIKey(api_key))
-                key_index += 1
-            else:
-                break
-        
-        # If no environment variables found, use config file (PyPI package)
-        if not keys and GROQ_CONFIG.get("api_keys"):
-            for api_key in GROQ_CONFIG["api_keys"]:
-                keys.append(GroqAPIKey(api_key))
-        
-        return keys
+        Each service gets its own GroqAPIKey objects, so exhaustion state is per instance.
+        """
+        return [GroqAPIKey(api_key) for api_key in configured_api_keys()]
     
     def get_next_available_key(self) -> Optional[GroqAPIKey]:
         """Get the next available API key, rotating through all keys."""
@@ -63,11 +136,10 @@ class GroqAPIService:
         while attempts < len(self.api_keys):
             key = self.api_keys[self.current_key_index]
             
-            # Reset exhausted keys after 1 hour
-            if key.is_exhausted and key.last_error_time:
-                if time.time() - key.last_error_time > 3600:  # 1 hour
-                    key.is_exhausted = False
-                    key.last_error_time = None
+            # Reset exhausted keys once their cooldown has passed
+            if key.is_exhausted and time.time() >= key.cooldown_until:
+                key.is_exhausted = False
+                key.last_error_time = None
             
             if not key.is_exhausted:
                 return key
@@ -78,14 +150,39 @@ class GroqAPIService:
         
         return None  # All keys are exhausted
     
-    def mark_key_exhausted(self, key: GroqAPIKey):
-        """Mark a key as exhausted."""
+    def mark_key_exhausted(self, key: GroqAPIKey, cooldown: float = KEY_EXHAUSTED_COOLDOWN):
+        """Mark a key as exhausted for cooldown seconds."""
         key.is_exhausted = True
         key.last_error_time = time.time()
-        print(f"API key ending in ...{key.key[-4:]} marked as exhausted")
+        key.cooldown_until = key.last_error_time + cooldown
+        print(f"API key ending in ...{key.last4} marked as exhausted")
+    
+    def _circuit_open(self) -> bool:
+        """Check whether calls should fail fast because the API keeps failing."""
+        if self._circuit_opened_at is None:
+            return False
+        if time.time() - self._circuit_opened_at < CIRCUIT_RESET_TIME:
+            return True
+        # Half-open: let one probe through; a single further failure reopens
+        self._circuit_opened_at = None
+        self._circuit_failures = CIRCUIT_FAILURE_THRESHOLD - 1
+        return False
     
-    def make_api_call(self, messages: List[Dict], max_retries: int = 3) -> Optional[str]:
-        """Make API call to Groq with automatic key rotation."""
+    def _record_failure(self):
+        """Count a failed request, opening the circuit at the threshold."""
+        self._circuit_failures += 1
+        if self._circuit_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self._circuit_opened_at = time.time()
+            print(f"Groq API failed {self._circuit_failures} times in a row; pausing calls for {CIRCUIT_RESET_TIME}s")
+    
+    def make_api_call(self, messages: List[Dict], max_retries: int = 3, json_mode: bool = False) -> Optional[str]:
+        """Make API call to Groq with automatic key rotation.
+        
+        With json_mode the model is constrained to emit a single JSON object.
+        """
+        if self._circuit_open():
+            return None
+        
         for attempt in range(max_retries):
             api_key = self.get_next_available_key()
             
@@ -93,10 +190,7 @@ class GroqAPIService:
                 print("All API keys are exhausted. Please wait or add more keys.")
                 return None
             
-            headers = {
-                "Authorization": f"Bearer {api_key.key}",
-                "Content-Type": "application/json"
-            }
+            headers = {"Authorization": f"Bearer {api_key.key}"}
             
             data = {
                 "model": self.model,
@@ -104,9 +198,11 @@ class GroqAPIService:
                 "temperature": 0.7,
                 "max_tokens": 2048
             }
+            if json_mode:
+                data["response_format"] = {"type": "json_object"}
             
             try:
-                response = requests.post(
+                response = self._session.post(
                     self.base_url,
                     headers=headers,
                     json=data,
@@ -114,35 +210,122 @@ class GroqAPIService:
                 )
                 
                 if response.status_code == 200: 
+                    self._circuit_failures = 0
                     result = response.json()
                     return result["choices"][0]["message"]["content"]
                 elif response.status_code == 429:  # Rate limit exceeded
-                    print(f"Rate limit exceeded for key ending in ...{api_key.key[-4:]}")
-                    self.mark_key_exhausted(api_key)
+                    print(f"Rate limit exceeded for key ending in ...{api_key.last4}")
+                    self.mark_key_exhausted(api_key, rate_limit_cooldown(response))
                     self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
                     continue
                 elif response.status_code == 401:  # Invalid API key
-                    print(f"Invalid API key ending in ...{api_key.key[-4:]}")
+                    print(f"Invalid API key ending in ...{api_key.last4}")
                     self.mark_key_exhausted(api_key)
                     self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
                     continue
+                elif response.status_code == 400 and json_mode:
+                    # The model could not produce valid JSON; ask again unconstrained
+                    # and let the caller's parsing deal with the reply
+                    print(f"JSON mode request rejected: {response.text}")
+                    json_mode = False
+                    continue
                 else:
                     print(f"API call failed with status {response.status_code}: {response.text}")
-                    if attempt == max_retries - 1:
+                    self._record_failure()
+                    if attempt == max_retries - 1 or self._circuit_opened_at is not None:
                         return None
-                    time.sleep(2 ** attempt)  # Exponential backoff
+                    time.sleep(retry_delay(attempt, response))
                     
             except requests.exceptions.RequestException as e:
                 print(f"Request exception: {e}")
-                if attempt == max_retries - 1:
+                self._record_failure()
+                if attempt == max_retries - 1 or self._circuit_opened_at is not None:
                     return None
-                time.sleep(2 ** attempt)  # Exponential backoff
+                time.sleep(retry_delay(attempt))
         
         return None
     
-    def generate_response(self, prompt: str, context: Dict = None) -> Optional[str]:
-        """Generate a response using Groq API."""
-        messages = [
+    def stream_api_call(self, messages: List[Dict], max_retries: int = 3) -> Iterator[str]:
+        """Make a streaming API call to Groq, yielding the response text as it is generated.
+        
+        Keys are rotated and failed requests retried like make_api_call, as long as
+        nothing has been yielded yet. Yields nothing if every attempt fails; callers
+        fall back to their non-streamed handling. If the stream breaks after text
+        was yielded, StreamInterruptedError is raised instead of passing the partial
+        answer off as complete.
+        """
+        if self._circuit_open():
+            return
+        
+        for attempt in range(max_retries):
+            api_key = self.get_next_available_key()
+            
+            if not api_key:
+                print("All API keys are exhausted. Please wait or add more keys.")
+                return
+            
+            headers = {"Authorization": f"Bearer {api_key.key}"}
+            
+            data = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 2048,
+                "stream": True
+            }
+            
+            started = False
+            try:
+                with self._session.post(self.base_url, headers=headers, json=data, timeout=30, stream=True) as response:
+                    if response.status_code == 429:  # Rate limit exceeded
+                        print(f"Rate limit exceeded for key ending in ...{api_key.last4}")
+                        self.mark_key_exhausted(api_key, rate_limit_cooldown(response))
+                        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+                        continue
+                    if response.status_code == 401:  # Invalid API key
+                        print(f"Invalid API key ending in ...{api_key.last4}")
+                        self.mark_key_exhausted(api_key)
+                        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+                        continue
+                    if response.status_code != 200:
+                        print(f"API call failed with status {response.status_code}: {response.text}")
+                        self._record_failure()
+                        if attempt == max_retries - 1 or self._circuit_opened_at is not None:
+                            return
+                        time.sleep(retry_delay(attempt, response))
+                        continue
+                    self._circuit_failures = 0
+                    
+                    # Server-sent events: one "data: {...}" line per chunk, then "data: [DONE]"
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data: "):
+                            continue
+                        payload = line[len("data: "):]
+                        if payload == "[DONE]":
+                            return
+                        content = json.loads(payload)["choices"][0]["delta"].get("content")
+                        if content:
+                            started = True
+                            yield content
+                    
+                    # The connection closed before the end-of-stream marker
+                    raise ValueError("stream ended before [DONE]")
+                        
+            except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+                print(f"Streaming request failed: {e}")
+                self._record_failure()
+                if started:
+                    raise StreamInterruptedError(str(e)) from e
+                if attempt == max_retries - 1 or self._circuit_opened_at is not None:
+                    return
+                time.sleep(retry_delay(attempt))
+    
+    def close(self):
+        """Close the pooled HTTP connections."""
+        self._session.close()
+    
+    def _build_messages(self, prompt: str) -> List[Dict]:
+        return [
             {
                 "role": "system",
                 "content": "You are GitAgent, an AI assistant specialized in Git operations. Analyze the repository state and provide helpful Git command suggestions."
@@ -152,5 +335,45 @@ class GroqAPIService:
                 "content": prompt
             }
         ]
+    
+    def generate_response(self, prompt: str, context: Dict = None, use_cache: bool = True,
+                          json_mode: bool = False) -> Optional[str]:
+        """Generate a response using Groq API.
+        
+        Responses are remembered by prompt digest and mode, so asking the exact
+        same question again (e.g. after a command that changed nothing) skips
+        the API call; pass use_cache=False to always ask. Pass json_mode=True
+        for prompts whose reply must be a JSON object.
+        """
+        cache_key = (hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest(), json_mode)
+        if use_cache and cache_key in self._response_cache:
+            return self._response_cache[cache_key]
+        
+        response = self.make_api_call(self._build_messages(prompt), json_mode=json_mode)
         
-        return self.make_api_call(messages) 
\ No newline at end of file
+        # Failed calls and unusable replies are not cached so they are retried next time
+        if self._cacheable(response, json_mode):
+            if len(self._response_cache) >= RESPONSE_CACHE_SIZE:
+                del self._response_cache[next(iter(self._response_cache))]
+            self._response_cache[cache_key] = response
+        return response
+    
+    @staticmethod
+    def _cacheable(response: Optional[str], json_mode: bool) -> bool:
+        """Check whether a reply is a real answer worth reusing.
+        
+        In JSON mode that means an actual JSON object; a rejected JSON-mode
+        request is retried unconstrained and its free-form reply may not be one.
+        """
+        if response is None or not response.strip():
+            return False
+        if not json_mode:
+            return True
+        try:
+            return isinstance(json.loads(response), dict)
+        except ValueError:
+            return False
+    
+    def stream_response(self, prompt: str) -> Iterator[str]:
+        """Generate a response using Groq API, yielding it in chunks as it arrives."""
+        return self.stream_api_call(self._build_messages(prompt)) 
\ No newline at end of file
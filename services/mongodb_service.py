@@ -3,20 +3,62 @@ MongoDB service for GitAgent user management
 """
 
 import os
-from datetime import datetime
+import atexit
+import functools
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
 from typing import Optional, Dict, Any
 import pymongo
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.write_concern import WriteConcern
 import dotenv
 from .config import MONGODB_CONFIG
 
+@functools.lru_cache(maxsize=None)
+def _load_env():
+    """Load .env once per process; it can't change under a running process"""
+    dotenv.load_dotenv()
+
+
+def _ssl_config_index_file() -> Path:
+    """Get the path where the index of the last working SSL configuration is kept"""
+    # Imported here because setup_user imports this module
+    from setup_user import get_user_config_dir
+    return get_user_config_dir() / "mongo_ssl.idx"
+
+
+def _load_ssl_config_index() -> Optional[int]:
+    """Return the SSL configuration index that connected last time, if known"""
+    try:
+        return int(_ssl_config_index_file().read_text().strip())
+    except Exception:
+        return None
+
+
+def _save_ssl_config_index(index: int):
+    """Remember which SSL configuration connected"""
+    try:
+        _ssl_config_index_file().write_text(str(index))
+    except Exception:
+        # Only an optimization for the next start
+        pass
+
+
 class MongoDBService:
     """Service for managing GitAgent users in MongoDB"""
     
+    # A single MongoClient is shared by every instance in the process so
+    # repeated checks reuse pooled connections instead of re-handshaking
+    _client: Optional[MongoClient] = None
+    _client_lock = threading.Lock()
+    # create_index is a server round trip; it only needs to happen once per process
+    _indexes_ensured = False
+    
     def __init__(self):
         # Load environment variables (works in development with .env file)
-        dotenv.load_dotenv()
+        _load_env()
         
         # Priority order:
         # 1. Environment variables (development/deployment)
@@ -48,6 +90,32 @@ class MongoDBService:
     
     def connect(self) -> bool:
         """Connect to MongoDB with SSL fallback options"""
+        with MongoDBService._client_lock:
+            if MongoDBService._client is not None:
+                try:
+                    MongoDBService._client.admin.command('ping')
+                    self._bind_client(MongoDBService._client)
+                    return True
+                except Exception:
+                    MongoDBService._close_client()
+            
+            return self._open_client()
+    
+    def _bind_client(self, client: MongoClient):
+        """Point this instance at a connected client"""
+        self.client = client
+        self.db = client[self.database_name]
+        self.collection = self.db[self.collection_name]
+    
+    @classmethod
+    def _close_client(cls):
+        """Close the shared client, if any"""
+        if cls._client is not None:
+            cls._client.close()
+            cls._client = None
+    
+    def _open_client(self) -> bool:
+        """Open the shared client, trying each SSL configuration in turn"""
         # Try different SSL configurations for maximum compatibility
         ssl_configs = [
             # Default SSL (most secure - works for most users)
@@ -71,17 +139,29 @@ class MongoDBService:
             }
         ]
         
-        for i, ssl_config in enumerate(ssl_configs):
+        # The verified default always goes first, so a network that once needed
+        # an insecure fallback doesn't downgrade TLS for good. Among the fallbacks,
+        # the one that worked last time is tried first
+        known_index = _load_ssl_config_index()
+        order = list(range(len(ssl_configs)))
+        if known_index in order[1:]:
+            order.remove(known_index)
+            order.insert(1, known_index)
+        
+        for i, config_index in enumerate(order):
+            ssl_config = ssl_configs[config_index]
             try:
                 print(f"🔄 Attempting connection (method {i+1}/{len(ssl_configs)})...")
                 
                 self.client = MongoClient(
                     self.connection_string,
-                    serverSelectionTimeoutMS=8000,   # Increased timeout for slower networks
+                    # A known-good configuration should answer quickly; if it doesn't, move on
+                    serverSelectionTimeoutMS=3000 if config_index == known_index else 8000,
                     connectTimeoutMS=15000,          # Increased timeout for slower networks
                     socketTimeoutMS=15000,           # Increased timeout for slower networks
                     retryWrites=True,                # Enable retryable writes
                     maxPoolSize=10,                  # Limit connection pool size
+                    waitQueueTimeoutMS=5000,         # Fail instead of queueing forever on a busy pool
                     **ssl_config
                 )
                 
@@ -95,10 +175,15 @@ class MongoDBService:
                 # Test collection access
                 self.collection.find_one({}, {"_id": 1})
                 
+                MongoDBService._client = self.client
+                if config_index != known_index:
+                    _save_ssl_config_index(config_index)
+                self._ensure_indexes()
                 print("✅ Successfully connected to MongoDB!")
                 return True
                 
             except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+                self._discard_failed_client()
                 if i == len(ssl_configs) - 1:  # Last attempt
                     print(f"❌ Failed to connect to MongoDB after all attempts.")
                     print("🌐 Network Connectivity Issues Detected")
@@ -120,6 +205,7 @@ class MongoDBService:
                     continue
                     
             except Exception as e:
+                self._discard_failed_client()
                 error_msg = str(e).lower()
                 if "authentication" in error_msg:
                     print(f"❌ Database authentication failed. Please contact GitAgent support.")
@@ -142,13 +228,38 @@ class MongoDBService:
         
         return False
     
-    def disconnect(self):
-        """Disconnect from MongoDB"""
-        if self.client:
+    def _discard_failed_client(self):
+        """Close a client whose connection attempt failed, so its pool and monitor threads don't linger"""
+        if self.client is not None:
             self.client.close()
-            self.client = None
-            self.db = None
-            self.collection = None
+        self.client = None
+        self.db = None
+        self.collection = None
+    
+    def _ensure_indexes(self):
+        """Create the index that covers API key lookups by email, once per process"""
+        if MongoDBService._indexes_ensured:
+            return
+        try:
+            self.collection.create_index([("email", 1), ("apiKey", 1)])
+        except Exception:
+            # Missing privileges only cost us the covered query, not correctness
+            pass
+        MongoDBService._indexes_ensured = True
+    
+    def disconnect(self):
+        """Release this instance's handles; the shared client stays pooled"""
+        self.client = None
+        self.db = None
+        self.collection = None
+    
+    def _user_writes(self):
+        """The users collection with a primary-only write concern.
+        
+        Profile writes are idempotent and re-run by setup, so they don't wait
+        for replication acknowledgement.
+        """
+        return self.collection.with_options(write_concern=WriteConcern(w=1))
     
     def user_exists(self, email: str) -> bool:
         """Check if user exists in database"""
@@ -168,14 +279,15 @@ class MongoDBService:
             return False
         
         try:
+            now = datetime.now(timezone.utc)
             user_data = {
                 "email": email,
-                "createdAt": datetime.utcnow(),
-                "updatedAt": datetime.utcnow(),
+                "createdAt": now,
+                "updatedAt": now,
                 "apiKey": api_key or ""  # Will be manually set later
             }
             
-            result = self.collection.insert_one(user_data)
+            result = self._user_writes().insert_one(user_data)
             return result.inserted_id is not None
             
         except Exception as e:
@@ -200,9 +312,9 @@ class MongoDBService:
             return False
         
         try:
-            update_data["updatedAt"] = datetime.utcnow()
+            update_data["updatedAt"] = datetime.now(timezone.utc)
             
-            result = self.collection.update_one(
+            result = self._user_writes().update_one(
                 {"email": email},
                 {"$set": update_data}
             )
@@ -215,9 +327,38 @@ class MongoDBService:
     
     def has_valid_api_key(self, email: str) -> bool:
         """Check if user has a valid API key"""
-        user = self.get_user(email)
+        if self.collection is None:
+            return False
+        
+        try:
+            # Project only the key so the {email, apiKey} index can cover the query
+            user = self.collection.find_one({"email": email}, projection={"apiKey": 1, "_id": 0})
+        except Exception as e:
+            print(f"❌ Error getting user: {e}")
+            return False
+        
         if not user:
             return False
         
         api_key = user.get("apiKey", "")
-        return api_key and api_key.strip() != ""
\ No newline at end of file
+        return api_key and api_key.strip() != ""
+
+
+@functools.lru_cache(maxsize=8)
+def cached_has_valid_api_key(email: str) -> bool:
+    """Check if user has a valid API key, memoized for the life of the process.
+    
+    Raises ConnectionError (which is not cached) if MongoDB is unreachable.
+    Call cached_has_valid_api_key.cache_clear() to force a fresh lookup.
+    """
+    mongo_service = MongoDBService()
+    if not mongo_service.connect():
+        raise ConnectionError("Cannot connect to MongoDB")
+    
+    try:
+        return bool(mongo_service.has_valid_api_key(email))
+    finally:
+        mongo_service.disconnect()
+
+
+atexit.register(MongoDBService._close_client)
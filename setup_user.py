@@ -7,6 +7,10 @@ This script runs after installation to set up the user profile
 import os
 import sys
 import re
+import json
+import time
+import hashlib
+import functools
 import subprocess
 from pathlib import Path
 from typing import Optional
@@ -25,14 +29,21 @@ def get_git_user_email() -> Optional[str]:
     return None
 
 
+# Compiled once; is_valid_email runs on every setup prompt
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
 def is_valid_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_RE.match(email) is not None
 
 
+@functools.lru_cache(maxsize=1)
 def get_user_config_dir() -> Path:
-    """Get the user's configuration directory"""
+    """Get the user's configuration directory.
+    
+    Memoized: the directory is created and write-tested only on the first call.
+    """
     try:
         if sys.platform == "win32":
             # Windows: Use APPDATA
@@ -70,8 +81,11 @@ def save_user_config(email: str):
         config_dir = get_user_config_dir()
         config_file = config_dir / "user.config"
         
-        with open(config_file, 'w') as f:
-            f.write(f"email={email}\n")
+        # Write to a temp file and swap it in so a crash never leaves a truncated config
+        tmp_file = config_file.with_suffix(".tmp")
+        tmp_file.write_text(f"email={email}\n", encoding="utf-8")
+        os.replace(tmp_file, config_file)
+        load_user_config.cache_clear()
         
         print(f"📁 Configuration saved to: {config_file}")
         return True
@@ -82,8 +96,12 @@ def save_user_config(email: str):
         return False
 
 
+@functools.lru_cache(maxsize=1)
 def load_user_config() -> Optional[str]:
-    """Load user email from local configuration"""
+    """Load user email from local configuration.
+    
+    Memoized; save_user_config clears the cache when it writes a new email.
+    """
     # Try multiple locations
     possible_locations = []
     
@@ -99,18 +117,66 @@ def load_user_config() -> Optional[str]:
         pass
     
     for config_file in possible_locations:
-        if config_file.exists():
-            try:
-                with open(config_file, 'r') as f:
-                    content = f.read().strip()
-                    if content.startswith("email="):
-                        return content.split("=", 1)[1]
-            except Exception:
-                continue
+        try:
+            content = config_file.read_text(encoding="utf-8").strip()
+        except Exception:
+            # Missing or unreadable; try the next location
+            continue
+        if content.startswith("email="):
+            return content.split("=", 1)[1]
     
     return None
 
 
+API_KEY_CACHE_TTL = 600  # seconds
+
+
+def _api_key_cache_file() -> Path:
+    """Get the path of the local API key validation cache"""
+    return get_user_config_dir() / "apikey_cache.json"
+
+
+def _email_cache_key(email: str) -> str:
+    """Hash the email so it is not stored in plain text in the cache"""
+    return hashlib.sha256(email.encode("utf-8")).hexdigest()
+
+
+def is_api_key_cached(email: str) -> bool:
+    """Check if a recent successful API key validation is cached for this email"""
+    try:
+        with open(_api_key_cache_file(), 'r') as f:
+            cache = json.load(f)
+        entry = cache.get(_email_cache_key(email))
+        return bool(entry and entry.get("valid") and entry.get("expires", 0) > time.time())
+    except Exception:
+        return False
+
+
+def cache_api_key_validation(email: str):
+    """Remember a successful API key validation for API_KEY_CACHE_TTL seconds"""
+    try:
+        cache_file = _api_key_cache_file()
+        try:
+            with open(cache_file, 'r') as f:
+                cache = json.load(f)
+        except Exception:
+            cache = {}
+        
+        cache[_email_cache_key(email)] = {
+            "valid": True,
+            "expires": time.time() + API_KEY_CACHE_TTL
+        }
+        
+        # Write to a temp file and swap it in so readers never see a partial file
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, cache_file)
+    except Exception:
+        # The cache is an optimization only; failing to write it is harmless
+        pass
+
+
 def setup_user():
     """Main setup function"""
     print("\n" + "="*60)
@@ -177,11 +243,12 @@ def setup_user():
         sys.exit(1)
     
     try:
-        # Check if user exists
-        if mongo_service.user_exists(email):
+        # One lookup answers both whether the user exists and whether their key is set
+        user = mongo_service.get_user(email)
+        if user is not None:
             print("✅ User already exists in our database.")
             
-            if mongo_service.has_valid_api_key(email):
+            if (user.get("apiKey") or "").strip():
                 print("✅ Your API key is configured and ready!")
             else:
                 print("⚠️  Your API key is not configured yet.")
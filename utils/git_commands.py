@@ -1,26 +1,128 @@
 #!/usr/bin/env python3
 
+import os
 import subprocess
 import shlex
-from typing import List
+import threading
+from collections import deque
+from typing import List, Tuple
+
+# Keep each git call minimal: no pager, no colors, no opportunistic index
+# writes from read-only commands, and untranslated output for our parsers
+GIT_ENV = {**os.environ, "GIT_OPTIONAL_LOCKS": "0", "GIT_PAGER": "cat", "LC_ALL": "C"}
+GIT_PREFIX = ["git", "--no-pager", "-c", "color.ui=false"]
+
+# Subcommands that only read the repository; after running one, previously
+# collected repository info is still accurate
+READ_ONLY_GIT_COMMANDS = frozenset({
+    "status", "log", "diff", "show", "blame", "shortlog", "describe", "ls-files", "grep"
+})
+
+# Subcommands that only touch the index and working tree; refs and history
+# are left alone, so cached branch and log listings stay valid after them
+WORKTREE_ONLY_GIT_COMMANDS = frozenset({"add", "rm", "mv", "restore", "clean"})
+
+# .git paths whose mtimes change whenever local or remote-tracking refs move.
+# logs/HEAD is appended on every commit, checkout and reset; the refs
+# directories are walked recursively by git_path_mtimes(), so nested names
+# like feature/x and origin/main count. push updates refs/remotes/<remote>/*
+REF_DEPS = ("HEAD", "logs/HEAD", "refs/heads", "packed-refs")
+REMOTE_REF_DEPS = ("refs/remotes", "FETCH_HEAD", "packed-refs")
 
 def run_git_command(command: List[str]) -> str:
     try:
         # Add timeout to prevent hanging on interactive commands
+        # Output is read as bytes and decoded once; file names and commit
+        # messages aren't guaranteed to be valid UTF-8
         result = subprocess.run(
-            ["git"] + command,
+            GIT_PREFIX + command,
             capture_output=True,
-            text=True,
             check=True,
-            timeout=30  # 30 second timeout
+            timeout=30,  # 30 second timeout
+            env=GIT_ENV
         )
-        return result.stdout.strip()
+        return result.stdout.decode("utf-8", "replace").strip()
     except subprocess.TimeoutExpired:
         return "Error: Command timed out (likely waiting for user input)"
     except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.strip() if e.stderr else str(e)
+        error_msg = e.stderr.decode("utf-8", "replace").strip() if e.stderr else str(e)
         return f"Error: {error_msg}"
 
+def stream_git_command(command: List[str], tail_lines: int = 200) -> str:
+    """Run a git command, echoing its stdout line by line as it arrives.
+    
+    Only the last tail_lines lines are kept, so huge outputs (log -p, diff)
+    neither wait to be printed nor sit in memory in full. stderr is collected
+    separately and only reported when the command fails, like run_git_command.
+    """
+    try:
+        process = subprocess.Popen(
+            GIT_PREFIX + command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            env=GIT_ENV
+        )
+    except OSError as e:
+        return f"Error: {e}"
+    
+    # Drain stderr on its own thread so a chatty command can't fill the pipe
+    # and block while we're reading stdout
+    stderr_tail = deque(maxlen=tail_lines)
+    stderr_reader = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+    stderr_reader.start()
+    
+    # Same 30 second limit as run_git_command, enforced by killing the process
+    timer = threading.Timer(30, process.kill)
+    timer.start()
+    tail = deque(maxlen=tail_lines)
+    try:
+        for line in process.stdout:
+            print(line, end="")
+            tail.append(line)
+        process.wait()
+        stderr_reader.join()
+    finally:
+        timer.cancel()
+        process.stdout.close()
+        process.stderr.close()
+    
+    if process.returncode < 0:
+        return "Error: Command timed out (likely waiting for user input)"
+    if process.returncode != 0:
+        # Some failures (e.g. "nothing to commit") only explain themselves on stdout
+        error_msg = "".join(stderr_tail).strip() or "".join(tail).strip()
+        return f"Error: {error_msg or f'git exited with status {process.returncode}'}"
+    return "".join(tail).strip()
+
+def git_path_mtimes(git_dir: str, paths: Tuple[str, ...]) -> Tuple:
+    """Return the mtimes (ns) of paths under git_dir, None for missing ones.
+    
+    Used as a cache key: it changes whenever git rewrites one of those files.
+    Directories are walked recursively, since a directory's own mtime only
+    changes for its direct entries (refs/heads/feature/x lives one level down).
+    """
+    mtimes = []
+    for path in paths:
+        full_path = os.path.join(git_dir, path)
+        try:
+            mtimes.append(os.stat(full_path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+            continue
+        for root, dirs, files in os.walk(full_path):
+            dirs.sort()
+            for name in dirs + sorted(files):
+                try:
+                    mtimes.append(os.stat(os.path.join(root, name)).st_mtime_ns)
+                except OSError:
+                    mtimes.append(None)
+    return tuple(mtimes)
+
 def get_git_status() -> str:
     return run_git_command(["status"])
 
@@ -30,31 +132,56 @@ def get_git_branch() -> str:
 def get_git_remote_branches() -> str:
     return run_git_command(["branch", "-r"])
 
+def get_git_refs(head_detached: bool = False) -> Tuple[str, str]:
+    """Return (branches, remote_branches) formatted like `git branch` and
+    `git branch -r`, from a single for-each-ref call."""
+    output = run_git_command([
+        "for-each-ref", "--format=%(HEAD)|%(refname)|%(symref)", "refs/heads", "refs/remotes"
+    ])
+    if output.startswith("Error:"):
+        return output, output
+    
+    branches = ["* (HEAD detached)"] if head_detached else []
+    remote_branches = []
+    for line in output.splitlines():
+        marker, refname, symref = line.split("|", 2)
+        if refname.startswith("refs/heads/"):
+            branches.append(f"{'*' if marker == '*' else ' '} {refname[len('refs/heads/'):]}")
+        elif refname.startswith("refs/remotes/"):
+            name = refname[len("refs/remotes/"):]
+            if symref.startswith("refs/remotes/"):
+                name += f" -> {symref[len('refs/remotes/'):]}"
+            remote_branches.append(f"  {name}")
+    return "\n".join(branches), "\n".join(remote_branches)
+
 def get_git_log(num_entries: int = 5) -> str:
     return run_git_command(["log", f"-{num_entries}", "--oneline"])
 
-def get_git_diff() -> str:
-    return run_git_command(["diff", "--stat"])
+def get_git_diff(max_files: int = 30) -> str:
+    # Large change sets are cut by git itself; the summary line is always kept
+    return run_git_command(["diff", "--stat", f"--stat-count={max_files}"])
 
 def get_git_unpushed_commits() -> str:
-    try:
-        current_branch = run_git_command(["rev-parse", "--abbrev-ref", "HEAD"])
-        return run_git_command(["log", f"@{{u}}..{current_branch}", "--oneline"])
-    except:
-        return "Unable to determine unpushed commits."
+    # HEAD resolves in the same call, no separate rev-parse for the branch name.
+    # Without an upstream git fails and run_git_command returns its error text
+    return run_git_command(["log", "@{u}..HEAD", "--oneline"])
 
 def get_remotes() -> str:
     return run_git_command(["remote", "-v"])
 
-def execute_git_command(command: str) -> str:
-    """Execute a git command, properly handling quoted arguments and interactive operations."""
+def _parse_git_command(command: str) -> List[str]:
+    """Split a git command string into arguments, adding non-interactive flags where needed."""
     try:
         # Remove git prefix if present
         if command.startswith("git "):
             command = command[4:]
         
-        # Use shlex to properly parse quoted arguments
-        parts = shlex.split(command)
+        # Use shlex to properly parse quoted arguments; without quotes or
+        # escapes a plain whitespace split gives the same result
+        if '"' in command or "'" in command or "\\" in command:
+            parts = shlex.split(command)
+        else:
+            parts = command.split()
         
         # Handle interactive commands by adding non-interactive flags
         if parts and len(parts) > 0:
@@ -79,7 +206,7 @@ def execute_git_command(command: str) -> str:
                 print(f"🔧 Commit command with message: {parts}")
         
         print(f"🔧 Executing git command parts: {parts}")
-        return run_git_command(parts)
+        return parts
         
     except ValueError as e:
         # Fallback to simple split if shlex fails
@@ -87,4 +214,16 @@ def execute_git_command(command: str) -> str:
         parts = command.split()
         if parts and parts[0] == "git":
             parts = parts[1:]
-        return run_git_command(parts) 
\ No newline at end of file
+        return parts
+
+def execute_git_command(command: str) -> str:
+    """Execute a git command, properly handling quoted arguments and interactive operations."""
+    return run_git_command(_parse_git_command(command))
+
+def execute_git_command_streaming(command: str) -> str:
+    """Like execute_git_command, but echoes the command's output as it runs.
+    
+    Meant for the command the user asked for; internal and verification
+    commands should use execute_git_command so their output stays quiet.
+    """
+    return stream_git_command(_parse_git_command(command))
@@ -2,10 +2,18 @@
 
 import sys
 import os
+import codecs
+import select
 import termios
 import tty
-import select
-from typing import Optional
+from typing import List, Optional, Tuple
+
+# (cooked, raw) terminal attributes of stdin, captured on the first confirmation
+_terminal_modes: Optional[Tuple[List, List]] = None
+
+# Typed answers for the simple prompt; None means "use the default"
+_RESPONSE_MAP = {"": None, "y": True, "yes": True, "n": False, "no": False}
+_INVALID = object()
 
 def get_confirmation(prompt: str, default_yes: bool = True) -> bool:
     """
@@ -36,24 +44,40 @@ def _get_confirmation_with_shortcuts(prompt: str, default_yes: bool) -> bool:
         # Fall back to simple input on Windows
         return _get_confirmation_simple(prompt, default_yes)
     
-    print(f"{prompt}")
-    print("Press Enter for YES, Esc for NO, or type 'yes'/'no' and press Enter")
-    print("(Enter=yes, Esc=no, or type your choice): ", end="", flush=True)
+    sys.stdout.write(
+        f"{prompt}\n"
+        "Press Enter for YES, Esc for NO, or type 'yes'/'no' and press Enter\n"
+        "(Enter=yes, Esc=no, or type your choice): "
+    )
+    sys.stdout.flush()
     
-    # Save terminal settings
-    old_settings = termios.tcgetattr(sys.stdin)
+    global _terminal_modes
+    fd = sys.stdin.fileno()
     
-    try:
+    if _terminal_modes is None:
+        # Save terminal settings and derive raw mode once; later prompts just switch between them
+        old_settings = termios.tcgetattr(fd)
+        tty.setraw(fd)
+        _terminal_modes = (old_settings, termios.tcgetattr(fd))
+    else:
+        old_settings, raw_settings = _terminal_modes
         # Set terminal to raw mode
-        tty.setraw(sys.stdin.fileno())
-        
+        termios.tcsetattr(fd, termios.TCSAFLUSH, raw_settings)
+    
+    try:
         input_buffer = ""
+        # Keys are read byte by byte; multi-byte characters are reassembled
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
         
         while True:
-            # Check if input is available
-            if select.select([sys.stdin], [], [], 0) == ([sys.stdin], [], []):
-                char = sys.stdin.read(1)
-                
+            # Block until a key arrives instead of polling
+            data = os.read(fd, 1)
+            if not data:  # stdin closed; don't treat it as approval
+                print("\n")
+                return False
+            
+            char = decoder.decode(data)
+            if char:
                 # Handle special keys
                 if char == '\r' or char == '\n':  # Enter key
                     if input_buffer.strip() == "":
@@ -66,18 +90,23 @@ def _get_confirmation_with_shortcuts(prompt: str, default_yes: bool) -> bool:
                         print("\n")
                         return response in ['yes', 'y']
                 
-                elif char == '\x1b':  # Esc key
+                elif char == '\x1b':
+                    # Arrow and function keys also start with Esc, but the rest of
+                    # their sequence follows immediately; only a lone Esc means no
+                    if _skip_escape_sequence(fd):
+                        continue
                     print("\n")
                     return False
                 
                 elif char == '\x7f' or char == '\b':  # Backspace
                     if input_buffer:
                         input_buffer = input_buffer[:-1]
-                        print('\b \b', end='', flush=True)
+                        os.write(1, b'\b \b')
                 
                 elif char.isprintable():
                     input_buffer += char
-                    print(char, end='', flush=True)
+                    # Raw mode: echo straight to the terminal, bypassing the text layer
+                    os.write(1, char.encode('utf-8', 'replace'))
                 
                 elif char == '\x03':  # Ctrl+C
                     print("\n")
@@ -85,7 +114,27 @@ def _get_confirmation_with_shortcuts(prompt: str, default_yes: bool) -> bool:
     
     finally:
         # Restore terminal settings
-        termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_settings)
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+def _skip_escape_sequence(fd: int, timeout: float = 0.05) -> bool:
+    """After an Esc byte, consume the rest of a key's escape sequence if one follows.
+    
+    Returns False if nothing arrived within timeout, i.e. Esc was pressed on its own.
+    """
+    if not select.select([fd], [], [], timeout)[0]:
+        return False
+    
+    introducer = os.read(fd, 1)
+    if introducer == b'[':
+        # CSI: parameter bytes, then one final byte in @..~
+        while True:
+            byte = os.read(fd, 1)
+            if not byte or 0x40 <= byte[0] <= 0x7e:
+                break
+    elif introducer == b'O':
+        # SS3 (F1-F4, keypad): one more byte
+        os.read(fd, 1)
+    return True
 
 def _get_confirmation_simple(prompt: str, default_yes: bool) -> bool:
     """Simple confirmation fallback for systems without advanced keyboard support."""
@@ -95,16 +144,15 @@ def _get_confirmation_simple(prompt: str, default_yes: bool) -> bool:
     while True:
         try:
             response = input(full_prompt).strip().lower()
+            result = _RESPONSE_MAP.get(response, _INVALID)
             
-            if response == "":
+            if result is _INVALID:
+                print("Please enter 'yes', 'no', or just press Enter for default")
+            elif result is None:
                 # Empty input - use default
                 return default_yes
-            elif response in ["yes", "y"]:
-                return True
-            elif response in ["no", "n"]:
-                return False
             else:
-                print("Please enter 'yes', 'no', or just press Enter for default")
+                return result
                 
         except KeyboardInterrupt:
             print("\nOperation cancelled.")
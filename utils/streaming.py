@@ -1,9 +1,20 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 import time
+import itertools
 from typing import Optional
 
+# Set GIT_AGENT_NO_STREAM to print everything at once, even on a terminal
+NO_STREAM = bool(os.environ.get("GIT_AGENT_NO_STREAM"))
+
+# Common words that stream_formatted_text displays faster
+FAST_WORDS = frozenset({
+    'the', 'and', 'or', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'a', 'an',
+    'is', 'are', 'was', 'were', 'will', 'be', 'this', 'that'
+})
+
 def stream_text(text: str, delay: float = 0.03, end: str = '\n', flush: bool = True) -> None:
     """
     Stream text character by character with a delay.
@@ -14,11 +25,31 @@ def stream_text(text: str, delay: float = 0.03, end: str = '\n', flush: bool = T
         end: String appended after the text
         flush: Whether to flush output after each character
     """
-    for char in text:
-        print(char, end='', flush=flush)
-        if char not in [' ', '\n']:  # Don't delay on spaces and newlines for better flow
-            time.sleep(delay)
-    print(end, end='')
+    # Resolve stdout per call so redirect_stdout (daemon mode) still captures it
+    out = sys.stdout
+    if NO_STREAM or not out.isatty():
+        # Skip the pacing when it is disabled or nobody is watching (piped or captured output)
+        out.write(text + end)
+        return
+    
+    # Pace against a deadline, so sleep overshoot doesn't accumulate over long text
+    deadline = time.monotonic()
+    # Spaces and newlines aren't delayed (for better flow), so each run of them is written at once
+    for is_gap, run in itertools.groupby(text, key=' \n'.__contains__):
+        if is_gap:
+            out.write(''.join(run))
+            if flush:
+                out.flush()
+            continue
+        for char in run:
+            out.write(char)
+            if flush:
+                out.flush()
+            deadline += delay
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+    out.write(end)
 
 def stream_lines(lines: list, line_delay: float = 0.02, char_delay: float = 0.01) -> None:
     """
@@ -29,6 +60,10 @@ def stream_lines(lines: list, line_delay: float = 0.02, char_delay: float = 0.01
         line_delay: Delay between lines in seconds
         char_delay: Delay between characters in seconds
     """
+    if NO_STREAM or not sys.stdout.isatty():
+        sys.stdout.write('\n'.join(lines) + '\n')
+        return
+    
     for i, line in enumerate(lines):
         if i > 0:
             time.sleep(line_delay)
@@ -43,20 +78,36 @@ def stream_formatted_text(text: str, delay: float = 0.02) -> None:
         text: The text to stream
         delay: Base delay between characters
     """
-    # Common words that can be displayed faster
-    fast_words = {'the', 'and', 'or', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'a', 'an', 'is', 'are', 'was', 'were', 'will', 'be', 'this', 'that'}
+    out = sys.stdout
+    if NO_STREAM or not out.isatty():
+        out.write(text + '\n')
+        return
     
     words = text.split(' ')
+    # Lowercased once for the whole text; splitting on ' ' keeps it aligned with words
+    lowered_words = text.lower().split(' ')
+    deadline = time.monotonic()
     
-    for i, word in enumerate(words):
+    for i, (word, lowered) in enumerate(zip(words, lowered_words)):
         if i > 0:
-            print(' ', end='', flush=True)
+            out.write(' ')
             
-        # Determine speed based on word importance
-        word_delay = delay * 0.3 if word.lower() in fast_words else delay
+        # Common words are written whole, with the word's total delay after them
+        if lowered in FAST_WORDS:
+            out.write(word)
+            out.flush()
+            deadline += delay * 0.3 * len(word)
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            continue
         
         for char in word:
-            print(char, end='', flush=True)
-            time.sleep(word_delay)
+            out.write(char)
+            out.flush()
+            deadline += delay
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
     
-    print()  # Final newline 
\ No newline at end of file
+    out.write('\n')  # Final newline 
\ No newline at end of file